@@ -1,4 +1,6 @@
+import sys
 from model.train import train_lstm_model
+from model.finetune import fine_tune_lstm_model, list_deployed_symbols
 
 # List of symbols to train
 symbols = [
@@ -13,7 +15,33 @@ symbols = [
 ]
 
 if __name__ == "__main__":
-    print("Training LSTM model...")
-    for symbol in symbols:
-        print(f"Training model for {symbol}...")
-        train_lstm_model(symbol, 'D1')
+    # Fine-tune every deployed model on the bars that arrived since it was last trained
+    if "--fine-tune" in sys.argv:
+        print("Fine-tuning deployed LSTM models...")
+        deployed, kept, skipped, failed = [], [], [], []
+        for symbol in list_deployed_symbols('D1'):
+            print(f"Fine-tuning model for {symbol}...")
+            # One missing CSV or broken model shouldn't stop the remaining pairs from being refreshed
+            try:
+                result = fine_tune_lstm_model(symbol, 'D1')
+            except Exception as e:
+                print(f"Error fine-tuning model for {symbol}: {str(e)}")
+                failed.append(symbol)
+                continue
+
+            if result is None:
+                skipped.append(symbol)
+            elif result['deployed']:
+                deployed.append(symbol)
+            else:
+                kept.append(symbol)
+
+        print(f"Deployed fine-tuned models: {', '.join(deployed) or 'none'}")
+        print(f"Kept deployed models: {', '.join(kept) or 'none'}")
+        print(f"Skipped, no training metadata or not enough new bars: {', '.join(skipped) or 'none'}")
+        print(f"Failed: {', '.join(failed) or 'none'}")
+    else:
+        print("Training LSTM model...")
+        for symbol in symbols:
+            print(f"Training model for {symbol}...")
+            train_lstm_model(symbol, 'D1')
@@ -0,0 +1,127 @@
+import os
+import numpy as np
+import pandas as pd
+import joblib
+from keras.models import load_model
+from keras.optimizers import Adam
+from sklearn.metrics import mean_squared_error
+from model.preprocess import load_data, fill_missing_values, add_technical_indicators, FEATURE_COLUMNS
+from model.metadata import load_metadata, save_metadata
+
+data_directory = 'data'
+models_directory = os.path.join('..', 'server', 'models')
+
+def get_model_directory(symbol: str, period: str):
+    return os.path.join(models_directory, symbol, period.lower())
+
+# List the symbols that have a deployed model for the given period
+def list_deployed_symbols(period: str):
+    if not os.path.exists(models_directory):
+        return []
+    return sorted(
+        symbol for symbol in os.listdir(models_directory)
+        if os.path.exists(os.path.join(models_directory, symbol, period.lower(), 'model.keras'))
+    )
+
+# Normalize the data with the deployed scaler, it is never refitted so the server keeps using the same one
+def transform_data(data, scaler):
+    data_scaled = scaler.transform(data[FEATURE_COLUMNS])
+    return pd.DataFrame(data_scaled, columns=FEATURE_COLUMNS, index=data.index)
+
+# Create LSTM sequences only for the given label positions
+def create_sequences_at(data, positions, seq_length=30):
+    values = data[FEATURE_COLUMNS].values
+    close_index = FEATURE_COLUMNS.index('Close')
+
+    X = np.array([values[i - seq_length:i] for i in positions])
+    y = np.array([values[i, close_index] for i in positions])
+    return X, y
+
+def fine_tune_lstm_model(symbol: str, period: str, epochs=3, batch_size=32, learning_rate=1e-4, replay_ratio=1.0, holdout_fraction=0.2, min_holdout_bars=5, seq_length=30, seed=42):
+    model_directory = get_model_directory(symbol, period)
+    model_path = os.path.join(model_directory, 'model.keras')
+    scaler_path = os.path.join(model_directory, 'scaler.pkl')
+
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model file not found for {symbol} at {model_path}")
+    if not os.path.exists(scaler_path):
+        raise FileNotFoundError(f"Scaler file not found for {symbol} at {scaler_path}")
+
+    # Without the last training timestamp there is no telling which bars the model has already seen
+    metadata = load_metadata(model_directory)
+    last_trained_at = metadata.get('last_trained_at')
+    if last_trained_at is None:
+        print(f"Skipping {symbol}: no last_trained_at in {os.path.join(model_directory, 'metadata.json')}, retrain it with train_lstm_model first")
+        return None
+
+    model = load_model(model_path)
+    scaler = joblib.load(scaler_path)
+
+    data = load_data(data_directory, symbol, period)
+    data = fill_missing_values(data)
+    data = add_technical_indicators(data)
+    data_normalized = transform_data(data, scaler)
+
+    # Windows are identified by the position of the bar they predict
+    positions = np.arange(seq_length, len(data_normalized))
+    label_times = data_normalized.index[positions]
+
+    is_new = label_times > pd.Timestamp(last_trained_at)
+
+    new_positions = positions[is_new]
+    if len(new_positions) <= min_holdout_bars:
+        print(f"Skipping {symbol}: {len(new_positions)} new bars, at least {min_holdout_bars + 1} needed")
+        return None
+
+    # The most recent windows are held out to compare the deployed and the fine-tuned model,
+    # a share of the new windows so a nightly run with only a few new bars still gets refreshed
+    holdout_bars = min(max(min_holdout_bars, int(len(new_positions) * holdout_fraction)), len(new_positions) - 1)
+    train_positions = new_positions[:-holdout_bars]
+    holdout_positions = new_positions[-holdout_bars:]
+
+    # Mix in a random sample of older windows so the model doesn't forget the rest of the history
+    rng = np.random.default_rng(seed)
+    old_positions = positions[~is_new]
+    replay_size = min(len(old_positions), int(len(train_positions) * replay_ratio))
+    replay_positions = rng.choice(old_positions, size=replay_size, replace=False) if replay_size > 0 else np.array([], dtype=int)
+
+    X_train, y_train = create_sequences_at(data_normalized, np.concatenate([replay_positions, train_positions]), seq_length)
+    X_holdout, y_holdout = create_sequences_at(data_normalized, holdout_positions, seq_length)
+    print(f"Fine-tuning {symbol}: {len(train_positions)} new windows, {replay_size} replayed windows, {holdout_bars} holdout windows")
+
+    baseline_mse = float(mean_squared_error(y_holdout, model.predict(X_holdout, verbose=0).flatten()))
+
+    model.compile(optimizer=Adam(learning_rate=learning_rate), loss='mean_squared_error')
+    model.fit(X_train, y_train, epochs=epochs, batch_size=batch_size, shuffle=True, verbose=1)
+
+    fine_tuned_mse = float(mean_squared_error(y_holdout, model.predict(X_holdout, verbose=0).flatten()))
+    print(f"Holdout MSE for {symbol}: deployed {baseline_mse}, fine-tuned {fine_tuned_mse}")
+
+    result = {
+        'symbol': symbol,
+        'period': period,
+        'baseline_mse': baseline_mse,
+        'fine_tuned_mse': fine_tuned_mse,
+        'deployed': False,
+    }
+
+    if fine_tuned_mse > baseline_mse:
+        print(f"Keeping deployed model for {symbol}, fine-tuned model regressed on the holdout")
+        return result
+
+    # Save next to the deployed model and swap it in with a rename, so the server never loads a partial file
+    tmp_model_path = os.path.join(model_directory, 'model.tmp.keras')
+    model.save(tmp_model_path)
+    os.replace(tmp_model_path, model_path)
+
+    metadata.update({
+        # Holdout bars weren't trained on, they count as new again on the next run
+        'last_trained_at': str(data_normalized.index[train_positions[-1]]),
+        'fine_tuned_at': str(pd.Timestamp.utcnow()),
+        'holdout_mse': fine_tuned_mse,
+    })
+    save_metadata(model_directory, metadata)
+
+    result['deployed'] = True
+    print(f"Deployed fine-tuned model for {symbol}")
+    return result
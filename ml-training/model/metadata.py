@@ -0,0 +1,18 @@
+import json
+import os
+
+# Training metadata is stored next to the model and scaler, e.g. the timestamp of the last bar the model was trained on
+def load_metadata(model_directory: str):
+    metadata_path = os.path.join(model_directory, 'metadata.json')
+    if not os.path.exists(metadata_path):
+        return {}
+    with open(metadata_path) as file:
+        return json.load(file)
+
+# Write the metadata to a temporary file first so readers never see a partial file
+def save_metadata(model_directory: str, metadata: dict):
+    metadata_path = os.path.join(model_directory, 'metadata.json')
+    tmp_path = metadata_path + '.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(metadata, file, indent=2)
+    os.replace(tmp_path, metadata_path)
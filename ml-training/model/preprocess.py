@@ -4,6 +4,8 @@ import os
 from sklearn.preprocessing import MinMaxScaler
 import joblib
 
+FEATURE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'RSI', 'MACD', 'Signal_Line', 'Histogram']
+
 def load_data(data_directory: str, symbol: str, period: str):
     file_name = f"{symbol}_{period.upper()}.csv"
     file_path = os.path.join(data_directory, period, file_name)
@@ -55,8 +57,8 @@ def add_technical_indicators(data):
 # Normalize the data using MinMaxScaler
 def normalize_data(data, symbol):
     scaler = MinMaxScaler()
-    data_scaled = scaler.fit_transform(data[['Open', 'High', 'Low', 'Close', 'Volume', 'RSI', 'MACD', 'Signal_Line', 'Histogram']])
-    data_normalized = pd.DataFrame(data_scaled, columns=['Open', 'High', 'Low', 'Close', 'Volume', 'RSI', 'MACD', 'Signal_Line', 'Histogram'], index=data.index)
+    data_scaled = scaler.fit_transform(data[FEATURE_COLUMNS])
+    data_normalized = pd.DataFrame(data_scaled, columns=FEATURE_COLUMNS, index=data.index)
     
     joblib.dump(scaler, f'{symbol}/scaler.pkl') # Save the scaler for later use
     
@@ -68,11 +70,12 @@ import time
 def create_sequences(data, seq_length=30):
     sequences = []
     labels = []
+    label_times = []
     total_rows = len(data) - seq_length
     start_time = time.time()
     
     for i in range(total_rows):
-        seq = data.iloc[i:i+seq_length][['Open', 'High', 'Low', 'Close', 'Volume', 'RSI', 'MACD', 'Signal_Line', 'Histogram']].values
+        seq = data.iloc[i:i+seq_length][FEATURE_COLUMNS].values
         label = data.iloc[i+seq_length]['Close']
         
         # Skip if any NaN is found
@@ -81,6 +84,7 @@ def create_sequences(data, seq_length=30):
         
         sequences.append(seq)
         labels.append(label)
+        label_times.append(data.index[i+seq_length])
         
         # Print progress every 10,000 rows
         if i % 10000 == 0:
@@ -88,7 +92,7 @@ def create_sequences(data, seq_length=30):
             print(f"Processed {i}/{total_rows} rows. Elapsed time: {elapsed_time:.2f} seconds.")
     
     print(f"Finished creating sequences. Total sequences: {len(sequences)}. Total time: {time.time() - start_time:.2f} seconds.")
-    return np.array(sequences), np.array(labels)
+    return np.array(sequences), np.array(labels), np.array(label_times)
 
 
 def preprocess_data(data_directory: str, symbol: str, period: str, seq_length=30):
@@ -104,7 +108,7 @@ def preprocess_data(data_directory: str, symbol: str, period: str, seq_length=30
     data_normalized, scaler = normalize_data(data, symbol)
     print("After normalization. Shape:", data_normalized.shape)  # Debug
     
-    X, y = create_sequences(data_normalized, seq_length)
+    X, y, label_times = create_sequences(data_normalized, seq_length)
     print("Sequences created. X shape:", X.shape, "y shape:", y.shape)  # Debug
     
-    return X, y, scaler
+    return X, y, scaler, label_times
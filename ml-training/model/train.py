@@ -3,6 +3,7 @@ from sklearn.model_selection import KFold
 from keras.models import load_model
 from model.model import create_lstm_model
 from model.preprocess import preprocess_data
+from model.metadata import save_metadata
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import matplotlib.pyplot as plt
 import math
@@ -40,7 +41,7 @@ def train_lstm_model(symbol: str, period: str):
     if not os.path.exists(symbol):
         os.makedirs(symbol)
     
-    X, y, scaler = preprocess_data(data_directory, symbol, period)
+    X, y, scaler, label_times = preprocess_data(data_directory, symbol, period)
 
     # Initialize K-fold Cross Validation
     kf = KFold(n_splits=5, shuffle=False)
@@ -97,6 +98,7 @@ def train_lstm_model(symbol: str, period: str):
             best_model_score = mse
             best_model = model
             best_model_fold = fold  # Keep track of the fold
+            best_model_train_index = train_index
         
         # Plot predictions vs true values for each fold
         plt.figure(figsize=(12, 6))
@@ -123,4 +125,10 @@ def train_lstm_model(symbol: str, period: str):
 
     # Save the best model
     best_model.save(f'{symbol}/model.keras')
+
+    # Record the last bar the best model was trained on, fine-tuning only treats later bars as new.
+    # This replaces any metadata left by earlier fine-tuning runs.
+    save_metadata(symbol, {
+        'last_trained_at': str(label_times[best_model_train_index.max()]),
+    })
     print(f"Best Model is from Fold {best_model_fold + 1} with MSE: {best_model_score}")
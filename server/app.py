@@ -1,23 +1,49 @@
 from fastapi import FastAPI, HTTPException, Depends
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 from requests import get
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 import pandas as pd
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Optional
 
-from db import models, service, setup
+from db import export, maintenance, models, service, setup
 from prediction import calculate_macd, calculate_rsi, get_multiple_predictions, load_model_and_scaler, preprocess_data
 
-app = FastAPI()
-
 def get_db():
     db = setup.SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+def run_predictions_maintenance():
+    with setup.SessionLocal() as db:
+        return maintenance.run_maintenance(db)
+
+# Periodically compact and archive old predictions, each run is done in a worker thread in bounded batches.
+# The first run happens shortly after startup so frequent restarts don't keep postponing it, runs started
+# by other workers at the same time are skipped by the maintenance lock.
+async def predictions_maintenance_loop():
+    await asyncio.sleep(maintenance.STARTUP_DELAY_SECONDS)
+    while True:
+        try:
+            result = await asyncio.to_thread(run_predictions_maintenance)
+            print(f"Predictions maintenance finished: {result}")
+        except Exception as e:
+            print(f"Error during predictions maintenance: {str(e)}")
+        await asyncio.sleep(maintenance.INTERVAL_SECONDS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    task = asyncio.create_task(predictions_maintenance_loop()) if maintenance.INTERVAL_SECONDS > 0 else None
+    yield
+    if task is not None:
+        task.cancel()
+
+app = FastAPI(lifespan=lifespan)
         
 def match_date_to_period(period: str, offset: int = 0) -> datetime:
     # Convert the date to the nearest past date matching the given period, e.g. for 'd1' it should be the start of the current day
@@ -49,9 +75,42 @@ async def get_currency_pairs(db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching currency pairs: {str(e)}")
     
-@app.get("/download-db")
-def download_db():
-    return FileResponse("predictions.db", media_type="application/octet-stream", filename="predictions.db")
+@app.get("/predictions/export")
+def export_predictions(
+    currency_pair: Optional[str] = None,
+    period: Optional[str] = None,
+    model: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    format: str = "csv",
+    snapshot: bool = False,
+    include_archive: bool = False,
+    chunk_size: int = export.DEFAULT_CHUNK_SIZE,
+):
+    if format not in export.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format, expected one of: {', '.join(export.EXPORT_FORMATS)}")
+    if chunk_size < 1 or chunk_size > export.MAX_CHUNK_SIZE:
+        raise HTTPException(status_code=400, detail=f"chunk_size must be between 1 and {export.MAX_CHUNK_SIZE}")
+
+    # Called inside the export transaction, so the archive tables are listed from the same snapshot as the rows
+    def build_query(connection):
+        return export.build_export_query(
+            currency_pair=currency_pair.upper() if currency_pair else None,
+            period=period.lower() if period else None,
+            model=model,
+            date_from=date_from,
+            date_to=date_to,
+            archive_tables=maintenance.list_archive_tables(connection, date_from, date_to) if include_archive else (),
+        )
+
+    # The stream opens its own connection, the request session is closed before the body is sent
+    stream = export.stream_arrow if format == "arrow" else export.stream_csv
+    media_type, extension = export.EXPORT_FORMATS[format]
+    return StreamingResponse(
+        stream(setup.engine, build_query, chunk_size=chunk_size, snapshot=snapshot),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=predictions.{extension}"},
+    )
     
 @app.post("/symbol")
 async def add_currency_pair(payload: dict, db: Session = Depends(get_db)):
@@ -0,0 +1,146 @@
+import csv
+import io
+import pyarrow as pa
+from datetime import datetime
+from typing import Callable, Iterator, Optional, Sequence
+
+from sqlalchemy import Table, select, union_all
+from sqlalchemy.engine import Connection, Engine
+
+from db import models
+
+EXPORT_COLUMNS = ["currency_pair", "period", "model", "date", "value", "last_live_value", "created_at", "updated_at"]
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+}
+DEFAULT_CHUNK_SIZE = 5000
+MAX_CHUNK_SIZE = 50000
+
+# Build the export query with the names of the related records instead of their ids.
+# Rows from the given archive tables are included alongside the predictions table.
+def build_export_query(currency_pair: Optional[str] = None, period: Optional[str] = None, model: Optional[str] = None,
+                       date_from: Optional[datetime] = None, date_to: Optional[datetime] = None, archive_tables: Sequence[Table] = ()):
+    sources = [models.Prediction.__table__, *archive_tables]
+    parts = []
+    for source in sources:
+        part = select(
+            source.c.id,
+            source.c.currency_pair_id,
+            source.c.period_id,
+            source.c.prediction_model_id,
+            source.c.date,
+            source.c.value,
+            source.c.last_live_value,
+            source.c.created_at,
+            source.c.updated_at,
+        )
+        # Filter every part on its own so each table can use its date index
+        if date_from is not None:
+            part = part.where(source.c.date >= date_from)
+        if date_to is not None:
+            part = part.where(source.c.date < date_to)
+        parts.append(part)
+    prediction = (union_all(*parts) if len(parts) > 1 else parts[0]).subquery("prediction")
+
+    query = select(
+        models.CurrencyPair.name.label("currency_pair"),
+        models.Period.name.label("period"),
+        models.PredictionModel.name.label("model"),
+        prediction.c.date,
+        prediction.c.value,
+        prediction.c.last_live_value,
+        prediction.c.created_at,
+        prediction.c.updated_at,
+    ).join(
+        models.CurrencyPair, prediction.c.currency_pair_id == models.CurrencyPair.id
+    ).join(
+        models.Period, prediction.c.period_id == models.Period.id
+    ).join(
+        models.PredictionModel, prediction.c.prediction_model_id == models.PredictionModel.id
+    )
+
+    if currency_pair is not None:
+        query = query.where(models.CurrencyPair.name == currency_pair)
+    if period is not None:
+        query = query.where(models.Period.name == period)
+    if model is not None:
+        query = query.where(models.PredictionModel.name == model)
+
+    # Order by the primary key as well so chunk boundaries are deterministic, ids stay unique when rows are archived
+    return query.order_by(models.CurrencyPair.name, models.Period.name, models.PredictionModel.name, prediction.c.date, prediction.c.id)
+
+# Yield the query results in chunks of rows using a server-side cursor. The query is built by build_query
+# inside the export transaction, so anything it looks up (like the archive tables) is read in that transaction too.
+def iter_export_chunks(engine: Engine, build_query: Callable[[Connection], object], chunk_size: int = DEFAULT_CHUNK_SIZE, snapshot: bool = False) -> Iterator[list]:
+    options = {"stream_results": True, "yield_per": chunk_size}
+    if snapshot:
+        # Under REPEATABLE READ every statement in the transaction sees the same snapshot, so the catalog lookups
+        # done by build_query (the archive tables) and the rows themselves are read at the same point in time
+        if engine.dialect.name == "postgresql":
+            options["isolation_level"] = "REPEATABLE READ"
+            options["postgresql_readonly"] = True
+        else:
+            options["isolation_level"] = "SERIALIZABLE"
+
+    with engine.connect() as connection:
+        connection = connection.execution_options(**options)
+        with connection.begin():
+            result = connection.execute(build_query(connection))
+            for partition in result.partitions():
+                yield partition
+
+# Stream the export as CSV, encoding one chunk at a time
+def stream_csv(engine: Engine, build_query: Callable[[Connection], object], chunk_size: int = DEFAULT_CHUNK_SIZE, snapshot: bool = False) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+
+    for chunk in iter_export_chunks(engine, build_query, chunk_size, snapshot):
+        writer.writerows(
+            [row.currency_pair, row.period, row.model, _isoformat(row.date), row.value, row.last_live_value,
+             _isoformat(row.created_at), _isoformat(row.updated_at)]
+            for row in chunk
+        )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    # Flush the header if the query returned no rows
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+# Stream the export as an Arrow IPC stream, writing one record batch per chunk
+def stream_arrow(engine: Engine, build_query: Callable[[Connection], object], chunk_size: int = DEFAULT_CHUNK_SIZE, snapshot: bool = False) -> Iterator[bytes]:
+    schema = pa.schema([
+        ("currency_pair", pa.string()),
+        ("period", pa.string()),
+        ("model", pa.string()),
+        ("date", pa.timestamp("us")),
+        ("value", pa.float64()),
+        ("last_live_value", pa.float64()),
+        ("created_at", pa.timestamp("us")),
+        ("updated_at", pa.timestamp("us")),
+    ])
+
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+    yield _drain(sink)
+
+    for chunk in iter_export_chunks(engine, build_query, chunk_size, snapshot):
+        columns = list(zip(*chunk))
+        writer.write_batch(pa.record_batch([pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+        yield _drain(sink)
+
+    writer.close()
+    yield _drain(sink)
+
+def _isoformat(value: Optional[datetime]) -> str:
+    return value.isoformat() if value is not None else ""
+
+# Take the bytes written to the buffer so far and empty it, so memory stays bounded by a single chunk
+def _drain(buffer: io.BytesIO) -> bytes:
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+    return data
@@ -0,0 +1,219 @@
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, Float, Integer, MetaData, Table, and_, delete, exists, insert, inspect, or_, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session, aliased
+from dotenv import load_dotenv
+
+from db import models
+
+# The settings are read on import, which can happen before setup.py loads the .env file
+load_dotenv()
+
+# Predictions with a target date inside this window stay in the predictions table and are returned by /predict.
+# The client's widest chart (3m) shows 90 weekday bars, about 126 calendar days, so the default leaves some margin.
+RETENTION_DAYS = int(os.getenv("PREDICTIONS_RETENTION_DAYS", "180"))
+# Move predictions older than the retention window into monthly archive tables, without it nothing leaves the hot table
+ARCHIVE_ENABLED = os.getenv("PREDICTIONS_ARCHIVE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Rows handled per transaction, keeps every lock on the predictions table short
+BATCH_SIZE = int(os.getenv("PREDICTIONS_MAINTENANCE_BATCH_SIZE", "1000"))
+# Pause between batches so writes from /predict are not starved
+BATCH_PAUSE_SECONDS = float(os.getenv("PREDICTIONS_MAINTENANCE_BATCH_PAUSE", "0.1"))
+# Seconds between background maintenance runs, 0 disables the background job
+INTERVAL_SECONDS = int(os.getenv("PREDICTIONS_MAINTENANCE_INTERVAL", "86400"))
+# Seconds to wait after startup before the first run, so it doesn't compete with the app starting up
+STARTUP_DELAY_SECONDS = int(os.getenv("PREDICTIONS_MAINTENANCE_STARTUP_DELAY", "60"))
+
+ARCHIVE_TABLE_PREFIX = "predictions_archive"
+ARCHIVE_TABLE_PATTERN = re.compile(rf"^{ARCHIVE_TABLE_PREFIX}_(\d{{4}})_(\d{{2}})$")
+# Postgres advisory lock key, shared by every process running the maintenance job
+ADVISORY_LOCK_KEY = 7270001
+
+# Fallback for databases without advisory locks, only guards runs within one process
+_process_lock = threading.Lock()
+
+# Archive tables live in their own metadata so create_all in setup.py doesn't create them
+archive_metadata = MetaData()
+
+# Get the definition of the archive table holding predictions for the given month
+def archive_table(year: int, month: int) -> Table:
+    name = f"{ARCHIVE_TABLE_PREFIX}_{year:04d}_{month:02d}"
+    table = archive_metadata.tables.get(name)
+    if table is None:
+        table = Table(
+            name,
+            archive_metadata,
+            Column("id", Integer, primary_key=True),
+            Column("currency_pair_id", Integer, nullable=False),
+            Column("period_id", Integer, nullable=False),
+            Column("prediction_model_id", Integer, nullable=False),
+            Column("value", Float),
+            Column("date", DateTime, index=True),
+            Column("last_live_value", Float),
+            Column("created_at", DateTime),
+            Column("updated_at", DateTime),
+        )
+    return table
+
+# Get (and create if missing) the archive table holding predictions for the given month
+def get_archive_table(db: Session, year: int, month: int) -> Table:
+    table = archive_table(year, month)
+    table.create(bind=db.connection(), checkfirst=True)
+    return table
+
+# List the existing archive tables whose month overlaps the [date_from, date_to) range
+def list_archive_tables(connection: Connection, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> List[Table]:
+    tables = []
+    for name in sorted(inspect(connection).get_table_names()):
+        match = ARCHIVE_TABLE_PATTERN.match(name)
+        if match is None:
+            continue
+        year, month = int(match.group(1)), int(match.group(2))
+        month_start = datetime(year, month, 1)
+        month_end = datetime(year + month // 12, month % 12 + 1, 1)
+        if date_from is not None and month_end <= date_from:
+            continue
+        if date_to is not None and month_start >= date_to:
+            continue
+        tables.append(archive_table(year, month))
+    return tables
+
+# Try to take the maintenance lock without waiting, yields whether it was acquired
+@contextmanager
+def maintenance_lock(engine: Engine) -> Iterator[bool]:
+    if engine.dialect.name != "postgresql":
+        acquired = _process_lock.acquire(blocking=False)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                _process_lock.release()
+        return
+
+    # Session-level advisory lock, held on its own connection for the whole run and released with it
+    with engine.connect() as connection:
+        acquired = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY}).scalar()
+        connection.commit()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+                connection.commit()
+
+# Create the predictions indexes on databases whose table was created before they were added to the model
+def ensure_indexes(db: Session):
+    engine = db.get_bind()
+    if engine.dialect.name != "postgresql":
+        for index in models.Prediction.__table__.indexes:
+            index.create(bind=db.connection(), checkfirst=True)
+        db.commit()
+        return
+
+    # Build missing indexes concurrently so /predict can keep writing to the table meanwhile,
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+    existing = {index["name"] for index in inspect(engine).get_indexes(models.Prediction.__tablename__)}
+    preparer = engine.dialect.identifier_preparer
+    with engine.connect() as connection:
+        connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+        for index in models.Prediction.__table__.indexes:
+            if index.name in existing:
+                continue
+            columns = ", ".join(preparer.quote(column.name) for column in index.columns)
+            connection.execute(text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {preparer.quote(index.name)} "
+                f"ON {preparer.format_table(index.table)} ({columns})"
+            ))
+
+# Delete superseded predictions older than the cutoff, keeping the latest value per target date.
+# The old rows are walked by id so every batch only looks at the next batch_size rows.
+def compact_predictions(db: Session, cutoff: datetime, batch_size: int = BATCH_SIZE, pause: float = BATCH_PAUSE_SECONDS) -> int:
+    prediction = models.Prediction
+    newer = aliased(models.Prediction)
+    newer_exists = exists().where(
+        newer.currency_pair_id == prediction.currency_pair_id,
+        newer.period_id == prediction.period_id,
+        newer.prediction_model_id == prediction.prediction_model_id,
+        newer.date == prediction.date,
+        or_(
+            newer.updated_at > prediction.updated_at,
+            and_(newer.updated_at == prediction.updated_at, newer.id > prediction.id),
+        ),
+    )
+
+    removed = 0
+    last_id = 0
+    while True:
+        batch_ids = db.execute(
+            select(prediction.id).where(prediction.id > last_id, prediction.date < cutoff).order_by(prediction.id).limit(batch_size)
+        ).scalars().all()
+        if not batch_ids:
+            return removed
+        last_id = batch_ids[-1]
+
+        ids = db.execute(
+            select(prediction.id).where(prediction.id.in_(batch_ids), newer_exists)
+        ).scalars().all()
+        if ids:
+            db.execute(delete(prediction).where(prediction.id.in_(ids)))
+            removed += len(ids)
+        db.commit()
+        time.sleep(pause)
+
+# Move predictions older than the cutoff into monthly archive tables, one batch per transaction
+def archive_predictions(db: Session, cutoff: datetime, batch_size: int = BATCH_SIZE, pause: float = BATCH_PAUSE_SECONDS) -> int:
+    prediction = models.Prediction.__table__
+    moved = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(prediction).where(prediction.c.id > last_id, prediction.c.date < cutoff).order_by(prediction.c.id).limit(batch_size)
+        ).mappings().all()
+        if not rows:
+            return moved
+        last_id = rows[-1]["id"]
+
+        partitions: Dict[Tuple[int, int], list] = {}
+        for row in rows:
+            partitions.setdefault((row["date"].year, row["date"].month), []).append(dict(row))
+
+        # Insert and delete in the same transaction so a row is never lost or duplicated
+        try:
+            for (year, month), partition_rows in partitions.items():
+                db.execute(insert(get_archive_table(db, year, month)), partition_rows)
+            db.execute(delete(prediction).where(prediction.c.id.in_([row["id"] for row in rows])))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        moved += len(rows)
+        time.sleep(pause)
+
+# Run the full maintenance pass: compaction first so only final values get archived.
+# The pass is skipped if another process is already running it.
+def run_maintenance(db: Session, retention_days: int = RETENTION_DAYS, archive: bool = ARCHIVE_ENABLED, batch_size: int = BATCH_SIZE) -> dict:
+    with maintenance_lock(db.get_bind()) as acquired:
+        if not acquired:
+            return {"skipped": True}
+
+        ensure_indexes(db)
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        compacted = compact_predictions(db, cutoff, batch_size)
+        archived = archive_predictions(db, cutoff, batch_size) if archive else 0
+        return {
+            "cutoff": cutoff,
+            "compacted": compacted,
+            "archived": archived,
+        }
+
+if __name__ == "__main__":
+    from db import setup
+
+    with setup.SessionLocal() as db:
+        print(run_maintenance(db))
@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, Float, ForeignKey, DateTime, Boolean, func
+from sqlalchemy import Integer, String, Float, ForeignKey, DateTime, Boolean, Index, func
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -50,6 +50,10 @@ class PredictionModel(Base):
 
 class Prediction(Base):
     __tablename__ = "predictions"
+    __table_args__ = (
+        # Covers the lookups by target date done by /predict and the predictions maintenance job
+        Index("ix_predictions_pair_period_model_date", "currency_pair_id", "period_id", "prediction_model_id", "date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     currency_pair_id: Mapped[int] = mapped_column(Integer, ForeignKey("currency_pairs.id"))